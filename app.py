@@ -1,5 +1,23 @@
+import atexit
+import concurrent.futures
+import csv
+import hashlib
+import io
+import json
+import os
+import queue
+import re
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+from urllib.parse import urljoin
+
+import lxml.html
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import streamlit as st
-import pandas as pd
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
@@ -7,8 +25,6 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
 from webdriver_manager.chrome import ChromeDriverManager
-import time
-from datetime import datetime
 
 # ==================================================================
 # === Chrome Driver Setup for Windows ===
@@ -17,207 +33,766 @@ from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
 
-def setup_driver():
+# Canonical headless flag set: background services, first-run UI, and crash
+# reporting all add startup latency and steady-state RSS that a scripted
+# admin session never benefits from.
+CHROME_FLAGS = [
+    "--headless=new",
+    "--window-size=1920x1080",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-background-timer-throttling",
+    "--disable-breakpad",
+    "--disable-client-side-phishing-detection",
+    "--disable-default-apps",
+    "--disable-hang-monitor",
+    "--disable-popup-blocking",
+    "--disable-prompt-on-repost",
+    "--disable-sync",
+    "--disable-translate",
+    "--metrics-recording-only",
+    "--mute-audio",
+    "--no-first-run",
+    "--safebrowsing-disable-auto-update",
+    "--password-store=basic",
+    "--use-mock-keychain",
+]
+
+# Asset patterns the automation never reads; blocked at the network layer
+# so fallback navigations move HTML and the form JS only. Stylesheets stay
+# unblocked - the admin widgets the fallback paths click are cheap but
+# fragile without them.
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg",
+    "*.woff", "*.woff2", "*.ttf",
+]
+
+# Only needed inside Docker-style Linux hosts; on macOS/Windows the sandbox
+# is fine and --disable-gpu is known to leak memory in the GPU helper.
+LINUX_CHROME_FLAGS = [
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+]
+
+# Deployments can pin the driver binary; otherwise the webdriver_manager
+# install path is resolved once and reused, skipping its version-check HTTP
+# call on every driver launch.
+CHROMEDRIVER_PATH = os.environ.get("CHROMEDRIVER_PATH")
+_chromedriver_path = None
+
+def _resolve_chromedriver():
+    global _chromedriver_path
+    if CHROMEDRIVER_PATH:
+        return CHROMEDRIVER_PATH
+    if _chromedriver_path is None or not os.path.exists(_chromedriver_path):
+        _chromedriver_path = ChromeDriverManager().install()
+    return _chromedriver_path
+
+def setup_driver(profile_slot=None):
     options = webdriver.ChromeOptions()
-    options.add_argument("--headless=new")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--window-size=1920x1080")
-    
+    for flag in CHROME_FLAGS:
+        options.add_argument(flag)
+    if sys.platform.startswith("linux"):
+        for flag in LINUX_CHROME_FLAGS:
+            options.add_argument(flag)
+    if profile_slot is not None:
+        # Pool slots reuse a fixed profile dir across runs so the HTTP cache
+        # of admin CSS/JS bundles stays warm after the first launch.
+        profile_dir = os.path.join(tempfile.gettempdir(), f"ax-chrome-{profile_slot}")
+        os.makedirs(profile_dir, exist_ok=True)
+    else:
+        # Isolated throwaway profile, removed at interpreter exit so one-off
+        # drivers don't accumulate state on disk.
+        profile_dir = tempfile.mkdtemp(prefix="chrome-profile-")
+        atexit.register(shutil.rmtree, profile_dir, ignore_errors=True)
+    options.add_argument(f"--user-data-dir={profile_dir}")
+    options.add_argument(f"--disk-cache-dir={os.path.join(profile_dir, 'cache')}")
+    # The admin pages carry no graphics worth loading.
+    options.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.default_content_setting_values.notifications": 2,
+    })
+    # Return from driver.get at DOMContentLoaded; element waits cover the rest.
+    options.page_load_strategy = 'eager'
+
     # Do NOT hardcode paths
     # service = Service(executable_path="/usr/local/bin/chromedriver")  # REMOVE
     # options.binary_location = "/usr/bin/google-chrome"  # REMOVE
     
-    # Let webdriver_manager install the correct ChromeDriver
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+    driver = webdriver.Chrome(service=Service(_resolve_chromedriver()), options=options)
+    driver.set_page_load_timeout(15)
+    # Keep the CDP page/network domains live for the in-page wait helpers.
+    driver.execute_cdp_cmd("Page.enable", {})
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
     return driver
+
+def visit(driver, url):
+    """Navigate without letting a slow page tail block the run.
+
+    The element wait that follows every navigation is the correctness
+    guarantee, so a page cut off mid-load is fine.
+    """
+    try:
+        driver.get(url)
+    except TimeoutException:
+        driver.execute_script("window.stop();")
 # ==================================================================
 # === Self-Healing Functions ===
 # ==================================================================
-def get_stale_proof_text(driver, locator, max_attempts=5):
-    attempts = 0
-    while attempts < max_attempts:
-        try:
-            element = WebDriverWait(driver, 10).until(EC.presence_of_element_located(locator))
-            return element.text
-        except StaleElementReferenceException:
-            attempts += 1
-            st.warning(f"Element went stale. Retry ({attempts}/{max_attempts})...")
-            time.sleep(1)
-    raise Exception(f"Could not get text from element at {locator}.")
-
-def stale_proof_click(driver, locator, max_attempts=5):
-    attempts = 0
-    while attempts < max_attempts:
-        try:
-            element = WebDriverWait(driver, 10).until(EC.element_to_be_clickable(locator))
-            driver.execute_script("arguments[0].click();", element)
-            return True
-        except (StaleElementReferenceException, TimeoutException):
-            attempts += 1
-            st.warning(f"Click failed. Retry ({attempts}/{max_attempts})...")
-            time.sleep(1)
-    raise Exception(f"Could not click element at {locator}.")
+# The JS waits inside the page on a MutationObserver, so one CDP call
+# replaces the old WebDriverWait retry loops and their 500ms polls, and it
+# unblocks the instant the node appears instead of at a poll boundary.
+# Stale references cannot happen: the element is found and used in the same
+# JS tick, never handed back to Python.
+def _cdp_eval(driver, expression):
+    resp = driver.execute_cdp_cmd(
+        "Runtime.evaluate",
+        {"expression": expression, "awaitPromise": True, "returnByValue": True},
+    )
+    return resp.get("result", {}).get("value")
+
+def _js_wait_expression(finder, action, miss, timeout_ms):
+    """Promise that runs `action` on the first `finder` match, observing DOM
+    mutations until `timeout_ms`, after which it resolves to `miss`."""
+    return """
+        new Promise(resolve => {
+            const find = () => %s;
+            const done = el => { observer.disconnect(); clearTimeout(timer); %s };
+            const observer = new MutationObserver(() => { const el = find(); if (el) done(el); });
+            const timer = setTimeout(() => { observer.disconnect(); resolve(%s); }, %d);
+            const el = find();
+            if (el) { done(el); return; }
+            observer.observe(document.documentElement,
+                             {childList: true, subtree: true, attributes: true});
+        })
+    """ % (finder, action, miss, timeout_ms)
+
+def js_find(driver, css, timeout_ms=10000):
+    """Wait for a CSS match inside the page; return its innerText or None."""
+    return _cdp_eval(driver, _js_wait_expression(
+        "document.querySelector(%s)" % json.dumps(css),
+        "el.scrollIntoView(); resolve(el.innerText);",
+        "null", timeout_ms))
+
+def js_click(driver, css, timeout_ms=10000):
+    """Wait for a CSS match inside the page and click it; return True/False."""
+    return bool(_cdp_eval(driver, _js_wait_expression(
+        "document.querySelector(%s)" % json.dumps(css),
+        "el.scrollIntoView(); el.click(); resolve(true);",
+        "false", timeout_ms)))
+
+def js_find_all(driver, css, timeout_ms=10000):
+    """Wait for CSS matches and return all their innerText in one call."""
+    return _cdp_eval(driver, _js_wait_expression(
+        "(els => els.length ? els : null)(document.querySelectorAll(%s))" % json.dumps(css),
+        "resolve(Array.from(el, e => e.innerText.trim()));",
+        "[]", timeout_ms)) or []
+
+def get_stale_proof_text(driver, css, timeout_ms=10000):
+    text = js_find(driver, css, timeout_ms)
+    if text is None:
+        raise Exception(f"Could not get text from element at {css}.")
+    return text
+
+def stale_proof_click(driver, css, timeout_ms=10000):
+    if not js_click(driver, css, timeout_ms):
+        raise Exception(f"Could not click element at {css}.")
+    return True
+
+# ==================================================================
+# === Driver Pool ===
+# ==================================================================
+# I/O-bound workload: 4-8 concurrent admin sessions is essentially free.
+POOL_SIZE = int(os.environ.get("DRIVER_POOL_SIZE", 4))
+
+BASE_URL = "https://nxtwave-assessments-backend-topin-prod-apis.ccbp.in/admin/"
+ADD_CONFIG_URL = BASE_URL + "nw_assessments_core/orgassessreviewconfig/add/"
+ORG_ASSESS_URL = BASE_URL + "nw_assessments_core/organisationassessment/"
+ASSESS_LEVEL_URL = BASE_URL + "nw_assessments_core/assessmentlevel/"
+EXAM_URL = BASE_URL + "nkb_exam/exam/"
+
+# Accepts YYYY-MM-DD HH:MM with optional :SS; one compiled pattern replaces
+# per-value format inference during the batch pre-parse.
+_DT_RE = re.compile(r'^(\d{4})-(\d{2})-(\d{2}) (\d{2}):(\d{2})(?::(\d{2}))?$')
+_UUID_RE = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}')
+
+# Selector strings shared by the JS wait helpers and the fallback paths,
+# plus the By locators the remaining Selenium waits use; hoisted so the hot
+# path allocates no selector tuples.
+SEL_SUBMIT = 'input[type="submit"]'
+SEL_SUCCESS = "li.success"
+SEL_ASSESS_ID_TD = "#result_list td.field-assessment_id"
+SEL_UNIT_ID_TD = "#result_list td.field-unit_id"
+SEL_EXAM_LINK = "#result_list th.field-id a"
+
+LOC_USERNAME = (By.ID, "id_username")
+LOC_PASSWORD = (By.ID, "id_password")
+LOC_ORG_ASSESS = (By.ID, "id_org_assess")
+LOC_REVIEW_MODE = (By.ID, "id_review_mode")
+LOC_REVIEW_CHECKBOX = (By.ID, "id_enable_attempt_review")
+
+def make_wait(driver, t=20):
+    # 50ms polling instead of WebDriverWait's 500ms default; swallowing
+    # stale references here replaces the old per-helper retry loops.
+    return WebDriverWait(
+        driver, t, poll_frequency=0.05,
+        ignored_exceptions=(StaleElementReferenceException,),
+    )
+
+def login(driver, username, password):
+    visit(driver, BASE_URL)
+    if driver.get_cookie("sessionid"):
+        # A profile-restored session that is still valid lands straight on
+        # the admin index - no login form will ever appear, so don't wait
+        # for one. Accept it only when the banner shows the user we were
+        # asked to log in as; a profile warmed by another account must not
+        # silently run the batch as that account.
+        if "login" not in driver.current_url:
+            if username in (js_find(driver, "#user-tools", 5000) or ""):
+                return
+        # Otherwise the restored sessionid is stale or someone else's, and
+        # it would satisfy the cookie success check below without any
+        # credentials being accepted. Drop all cookies - now, while on the
+        # admin origin, so the call actually reaches them - and reload for
+        # a fresh csrftoken.
+        driver.delete_all_cookies()
+        visit(driver, BASE_URL)
+    make_wait(driver).until(EC.presence_of_element_located(LOC_USERNAME)).send_keys(username)
+    driver.find_element(*LOC_PASSWORD).send_keys(password)
+    stale_proof_click(driver, SEL_SUBMIT)
+    # The sessionid cookie lands on the login 302 itself, well before the
+    # admin index finishes painting, so poll for it instead of waiting on
+    # the #user-tools DOM node.
+    make_wait(driver).until(lambda d: d.get_cookie("sessionid"),
+                            message="Login failed: no sessionid cookie set.")
+
+def setup_driver_pool(n, username, password):
+    """Build n drivers, log each in once, and return them as a shared pool.
+
+    A failed login (wrong password, typically) aborts the build; drivers
+    launched up to that point are quit so retries don't pile up headless
+    Chrome processes.
+    """
+    # Profile dirs carry a credentials-derived token: the pool cache is
+    # keyed on (username, password), so a credential change builds a second
+    # pool while the old one still holds its profile locks - same-named
+    # dirs would make Chrome refuse to start.
+    token = hashlib.sha256(f"{username}\n{password}".encode()).hexdigest()[:12]
+    pool = queue.Queue()
+    try:
+        for pool_idx in range(n):
+            driver = setup_driver(f"{token}-{pool_idx}")
+            pool.put(driver)
+            login(driver, username, password)
+    except Exception:
+        drain_driver_pool(pool)
+        raise
+    return pool
+
+def drain_driver_pool(pool):
+    while not pool.empty():
+        pool.get_nowait().quit()
+
+def reset_driver(driver, username, password):
+    """Put a failed driver back into a known-good logged-in state.
+
+    Only runs on the error path: a hung dialog or half-submitted form from a
+    failed row must not break the next row that borrows this driver, but
+    successful rows keep their warm HTTP cache untouched. Returns False
+    when the relogin failed - the caller must not recycle such a driver.
+    """
+    try:
+        driver.execute_cdp_cmd("Page.handleJavaScriptDialog", {"accept": True})
+    except Exception:
+        pass
+    try:
+        driver.get("about:blank")
+        # delete_all_cookies only reaches the current document's domain,
+        # which is about:blank here; the CDP call clears the whole jar so
+        # the relogin really starts from scratch.
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        login(driver, username, password)
+        return True
+    except Exception:
+        return False
+
+@st.cache_resource(show_spinner=False)
+def get_driver_pool(username, password):
+    """Logged-in driver pool, cached across Streamlit reruns.
+
+    Repeated runs with the same credentials skip both the Chrome launches
+    and the login round-trips. The drivers are quit at interpreter exit
+    rather than per run so the cached resource stays usable.
+    """
+    pool = setup_driver_pool(POOL_SIZE, username, password)
+    atexit.register(drain_driver_pool, pool)
+    return pool
+
+def _pool_session_expired(pool):
+    """Probe one pooled driver to see if the cached admin session lapsed."""
+    driver = pool.get()
+    try:
+        visit(driver, BASE_URL)
+        return "login" in driver.current_url
+    finally:
+        pool.put(driver)
+
+# ==================================================================
+# === Direct Admin HTTP Helpers ===
+# ==================================================================
+# The Django admin pages behind Step 4 are plain forms, so one GET + POST
+# per unit replaces six chromedriver round-trips. The Selenium path is kept
+# as a fallback for when a POST is rejected.
+def session_from_driver(driver):
+    """Clone the driver's logged-in admin cookies into a requests.Session.
+
+    The mounted adapter keeps connections alive across the 6-10 requests a
+    row makes, amortizing the TLS handshake, and retries transient 5xx."""
+    sess = requests.Session()
+    sess.mount("https://", HTTPAdapter(
+        pool_connections=16, pool_maxsize=16,
+        max_retries=Retry(total=3, backoff_factor=0.2,
+                          status_forcelist=[502, 503, 504]),
+    ))
+    for c in driver.get_cookies():
+        sess.cookies.set(c["name"], c["value"])
+    sess.headers["Referer"] = BASE_URL
+    # Attached once here so every POST passes Django's CSRF check even when
+    # the parsed form did not carry a csrfmiddlewaretoken field.
+    csrf = sess.cookies.get("csrftoken")
+    if csrf:
+        sess.headers["X-CSRFToken"] = csrf
+    return sess
+
+def changelist_column_http(sess, url, prefix, field_class, cache=None):
+    """Search a changelist with ?q= and return one column's cell texts.
+
+    Returns None when the request fails so the caller can fall back to the
+    browser path.
+
+    `cache` is an optional per-run memo dict: bulk pastes from one org share
+    8-char prefixes, and repeating an identical search costs the server the
+    same query again. Dict reads/writes are atomic under the GIL, so worker
+    threads share the memo without a lock; failed searches are not cached.
+    """
+    key = (url, prefix, field_class)
+    if cache is not None and key in cache:
+        return cache[key]
+    resp = sess.get(url, params={"q": prefix})
+    if resp.status_code != 200:
+        return None
+    tree = lxml.html.fromstring(resp.content)
+    cells = tree.xpath(
+        f'//table[@id="result_list"]//td[contains(@class, "{field_class}")]')
+    texts = [cell.text_content().strip() for cell in cells]
+    if cache is not None:
+        cache[key] = texts
+    return texts
+
+def _form_fields(form):
+    """Collect the current values of every named field in an admin form."""
+    data = {}
+    for inp in form.xpath('.//input'):
+        name = inp.get('name')
+        if not name:
+            continue
+        itype = inp.get('type', 'text')
+        # Buttons only belong in the payload when clicked; replaying them
+        # all would make Django treat every save as "_continue".
+        if itype in ('submit', 'button', 'image'):
+            continue
+        if itype in ('checkbox', 'radio') and inp.get('checked') is None:
+            continue
+        data[name] = inp.get('value') or ('on' if itype == 'checkbox' else '')
+    for sel in form.xpath('.//select'):
+        name = sel.get('name')
+        if not name:
+            continue
+        selected = sel.xpath('.//option[@selected]/@value')
+        if sel.get('multiple') is not None:
+            # requests encodes a list as repeated fields, the same way a
+            # browser submits a multi-valued select; nothing selected means
+            # nothing submitted.
+            if selected:
+                data[name] = selected
+        elif selected:
+            data[name] = selected[0]
+        else:
+            # A plain select with no selected attribute submits its first
+            # option, not an empty string.
+            first = sel.xpath('.//option[1]/@value')
+            data[name] = first[0] if first else ''
+    for area in form.xpath('.//textarea'):
+        if area.get('name'):
+            data[area.get('name')] = area.text or ''
+    return data
+
+def lookup_org_assess_pk(sess, assess_id):
+    """Resolve the org_assess primary key via the admin autocomplete endpoint.
+
+    This is the same AJAX call select2 would fire; asking it directly means
+    the injected <option> carries the real pk instead of trusting the form
+    to accept the raw UUID.
+    """
+    resp = sess.get(BASE_URL + "autocomplete/", params={
+        "app_label": "nw_assessments_core",
+        "model_name": "orgassessreviewconfig",
+        "field_name": "org_assess",
+        "term": assess_id[:8],
+    })
+    if resp.status_code != 200:
+        return None
+    try:
+        entries = resp.json().get("results", [])
+    except ValueError:
+        return None
+    for entry in entries:
+        if assess_id in entry.get("text", ""):
+            return entry.get("id")
+    return None
+
+def create_review_config_http(sess, org_assess_pk, time_delta_seconds):
+    """Create the review config via a direct admin form POST.
+
+    One GET (for the csrf token and form defaults) plus one POST replaces a
+    full add-page render, the select2 bundle, and the save round-trip.
+    Returns (True, new_assessment_id_or_None) on success; the id comes from
+    the organisationassessment link on the success page when present, which
+    saves the caller a separate changelist search. Returns (False, None)
+    when the caller should fall back to the browser path.
+    """
+    resp = sess.get(ADD_CONFIG_URL)
+    if resp.status_code != 200:
+        return False, None
+    tree = lxml.html.fromstring(resp.text)
+    forms = tree.xpath('//form[.//input[@name="csrfmiddlewaretoken"]]')
+    if not forms:
+        return False, None
+    data = _form_fields(forms[0])
+    data["org_assess"] = str(org_assess_pk)
+    data["review_mode"] = "ASSESS_COMPLETION"
+    data["time_to_enable_review_in_secs"] = str(time_delta_seconds)
+    data["_save"] = "Save"
+    resp = sess.post(ADD_CONFIG_URL, data=data, headers={"Referer": ADD_CONFIG_URL})
+    if not _admin_save_succeeded(resp):
+        return False, None
+    return True, _success_page_assessment_id(resp.text)
+
+def _admin_save_succeeded(resp):
+    """True when an admin form POST actually saved.
+
+    A rejected save re-renders the form with a 200, so the status code
+    alone proves nothing; a real save shows up as the post-save redirect
+    (resp.history, since the session follows it) or as the success message
+    on the landing page. This is the HTTP equivalent of the li.success
+    wait on the browser path.
+    """
+    return (resp.status_code < 400
+            and (bool(resp.history) or 'class="success"' in resp.text))
+
+def _success_page_assessment_id(html):
+    """Pull the new assessment UUID out of a save-confirmation page, if the
+    success message links back to the organisation assessment."""
+    tree = lxml.html.fromstring(html)
+    for text in tree.xpath('//a[contains(@href, "organisationassessment")]/text()'):
+        match = _UUID_RE.search(text)
+        if match:
+            return match.group(0)
+    return None
+
+def enable_review_http(sess, unit_id):
+    """Enable attempt review for one unit via direct admin form POSTs.
+
+    Returns True on success, False when the admin rejects any request so the
+    caller can fall back to driving the UI.
+    """
+    resp = sess.get(EXAM_URL, params={"q": unit_id[:8]})
+    if resp.status_code != 200:
+        return False
+    tree = lxml.html.fromstring(resp.text)
+    hrefs = tree.xpath('//table[@id="result_list"]//th[contains(@class, "field-id")]/a/@href')
+    if not hrefs:
+        return False
+    change_url = urljoin(resp.url, hrefs[0])
+
+    resp = sess.get(change_url)
+    if resp.status_code != 200:
+        return False
+    tree = lxml.html.fromstring(resp.text)
+    forms = tree.xpath('//form[.//input[@name="csrfmiddlewaretoken"]]')
+    if not forms:
+        return False
+    data = _form_fields(forms[0])
+    data["enable_attempt_review"] = "on"
+    data["_save"] = "Save"
+    resp = sess.post(change_url, data=data, headers={"Referer": change_url})
+    return _admin_save_succeeded(resp)
 
 # ==================================================================
 # === Main Automation Function ===
 # ==================================================================
-def perform_automation(username, password, assessment_data):
+def process_row(original_assess_id, time_delta_seconds, pool, creds, search_cache):
+    """Process one pre-parsed assessment on a driver borrowed from the pool.
+
+    Runs on a worker thread, so no Streamlit calls are allowed here; log
+    messages are collected and rendered by the main thread on completion.
+    """
+    driver = pool.get()
+    driver_ok = True
     try:
-        st.info("🚀 Launching the automation robot...")
-        driver = setup_driver()
-        wait = WebDriverWait(driver, 20)
-        st.success("✅ Robot launched successfully.")
-    except Exception as e:
-        st.error(f"Failed to start Chrome. Error: {e}")
-        return
+        result, log, driver_ok = _process_row(
+            driver, original_assess_id, time_delta_seconds, creds, search_cache)
+        return result, log
+    finally:
+        if not driver_ok:
+            # A driver whose re-login failed would sink every row that
+            # borrows it; swap it out rather than recycle it.
+            driver = _replace_driver(driver, creds)
+        pool.put(driver)
+
+def _replace_driver(driver, creds):
+    """Swap a known-bad driver for a fresh logged-in one.
 
-    # 1. Login Process
+    If the replacement cannot log in either (admin down, say), the old
+    driver is returned so the pool never shrinks - rows then keep failing
+    visibly instead of deadlocking on an empty pool.
+    """
+    fresh = None
+    try:
+        fresh = setup_driver()
+        login(fresh, *creds)
+    except Exception:
+        if fresh is not None:
+            try:
+                fresh.quit()
+            except Exception:
+                pass
+        return driver
     try:
-        base_url = "https://nxtwave-assessments-backend-topin-prod-apis.ccbp.in/admin/"
-        driver.get(base_url)
-        wait.until(EC.presence_of_element_located((By.ID, "id_username"))).send_keys(username)
-        driver.find_element(By.ID, "id_password").send_keys(password)
-        driver.find_element(By.CSS_SELECTOR, 'input[type="submit"]').click()
-        wait.until(EC.presence_of_element_located((By.ID, "user-tools")))
-        st.success("✅ Login Successful!")
-    except Exception as e:
-        st.error(f"Login failed. Error: {e}")
         driver.quit()
-        return
+    except Exception:
+        pass
+    return fresh
+
+class Log:
+    """Per-assessment log buffer. Worker threads cannot touch st.* directly,
+    so each row collects its lines here and the main thread renders them in
+    one expander instead of one widget per message."""
+    def __init__(self):
+        self.lines = []
+
+    def success(self, msg):
+        self.lines.append(f"✅ {msg}")
+
+    def error(self, msg):
+        self.lines.append(f"❌ {msg}")
+
+def _process_row(driver, original_assess_id, time_delta_seconds, creds, search_cache):
+    WAIT = lambda t=20: make_wait(driver, t)
+    log = Log()
+    result = {"ID": original_assess_id, "Status": "Failed", "Details": ""}
+    try:
+        # --- Step 1: Create Review Config ---
+        sess = session_from_driver(driver)
+        pk = lookup_org_assess_pk(sess, original_assess_id)
+
+        created, new_assessment_id = (False, None)
+        if pk is not None:
+            created, new_assessment_id = create_review_config_http(
+                sess, pk, time_delta_seconds)
+        if not created:
+            # Fallback: render the add form in the browser when the direct
+            # POST path is unavailable.
+            visit(driver, ADD_CONFIG_URL)
+            # select2 is only a UI overlay on the plain <select id="id_org_assess">,
+            # so injecting the chosen option directly replaces the whole
+            # open -> type -> AJAX -> suggestion-click dance with one script call.
+            WAIT().until(EC.presence_of_element_located(LOC_ORG_ASSESS))
+            driver.execute_script(
+                "const sel = document.getElementById('id_org_assess');"
+                "const opt = document.createElement('option');"
+                "opt.value = arguments[0]; opt.textContent = arguments[1];"
+                "opt.selected = true; sel.appendChild(opt);"
+                "jQuery(sel).trigger('change');",
+                pk if pk is not None else original_assess_id,
+                original_assess_id)
+
+            WAIT().until(EC.presence_of_element_located(LOC_REVIEW_MODE))
+            # One script call fills both fields and fires the events the form
+            # listens for, replacing four find/clear/send_keys round-trips.
+            driver.execute_script(
+                "const mode = document.getElementById('id_review_mode');"
+                "mode.value = 'ASSESS_COMPLETION';"
+                "mode.dispatchEvent(new Event('change', {bubbles: true}));"
+                "const secs = document.getElementById('id_time_to_enable_review_in_secs');"
+                "secs.value = arguments[0];"
+                "secs.dispatchEvent(new Event('input', {bubbles: true}));"
+                "secs.dispatchEvent(new Event('change', {bubbles: true}));",
+                str(time_delta_seconds))
+            driver.find_element(By.NAME, "_save").click()
+            if js_find(driver, SEL_SUCCESS, 20000) is None:
+                raise Exception("Save confirmation not shown after creating review config.")
+            new_assessment_id = _success_page_assessment_id(driver.page_source)
+        log.success(f"Step 1 complete for {original_assess_id}")
+        result["Status"] = "Success"
+        result["Details"] += "Review config created; "
+
+        # --- Step 2: Find New Assessment ID ---
+        # Usually already extracted from Step 1's success page; the ?q=
+        # changelist search only runs when that link was missing. Never
+        # memoized: Step 1 just added the very row this search must find,
+        # so a cached pre-creation result would resolve to the wrong id.
+        if new_assessment_id is None:
+            assessment_ids = changelist_column_http(
+                sess, ORG_ASSESS_URL, original_assess_id[:8], "field-assessment_id")
+            if assessment_ids:
+                new_assessment_id = assessment_ids[0]
+            else:
+                visit(driver, f"{ORG_ASSESS_URL}?q={original_assess_id[:8]}")
+                new_assessment_id = get_stale_proof_text(driver, SEL_ASSESS_ID_TD).strip()
+        log.success(f"Found new assessment ID: {new_assessment_id}")
+        result["Details"] += f"New ID: {new_assessment_id}; "
+
+        # --- Step 3: Find Unit IDs ---
+        unit_ids = changelist_column_http(
+            sess, ASSESS_LEVEL_URL, new_assessment_id[:8], "field-unit_id",
+            cache=search_cache)
+        if not unit_ids:
+            visit(driver, f"{ASSESS_LEVEL_URL}?q={new_assessment_id[:8]}")
+            # One JS evaluation returns every unit id in a single round-trip.
+            unit_ids = js_find_all(driver, SEL_UNIT_ID_TD, 2000)
 
-    # Process Assessment Data
-    lines = [line.strip() for line in assessment_data.strip().split('\n') if line.strip()]
-    total_lines = len(lines)
+        if not unit_ids:
+            log.error("Could not find any Unit IDs.")
+            result["Details"] += "No Unit IDs found; "
+            return result, log, True
+
+        log.success(f"Found {len(unit_ids)} Unit ID(s): {unit_ids}")
+        result["Details"] += f"Found {len(unit_ids)} units; "
+
+        # --- Step 4: Enable Review for Each Unit ---
+        # The units are independent and requests.Session handles concurrent
+        # calls, so the POSTs fan out instead of running one after another;
+        # only rejected units fall back to the (single) browser, serially.
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=min(4, len(unit_ids))) as unit_pool:
+            enabled = dict(zip(unit_ids, unit_pool.map(
+                lambda unit_id: enable_review_http(sess, unit_id), unit_ids)))
+        for unit_id in unit_ids:
+            if enabled[unit_id]:
+                result["Details"] += f"Enabled review for {unit_id}; "
+                continue
+
+            # Fallback: drive the admin UI when the direct POST is rejected.
+            visit(driver, f"{EXAM_URL}?q={unit_id[:8]}")
+            stale_proof_click(driver, SEL_EXAM_LINK)
+
+            review_checkbox = WAIT().until(EC.presence_of_element_located(LOC_REVIEW_CHECKBOX))
+            if not review_checkbox.is_selected():
+                review_checkbox.click()
+            driver.find_element(By.NAME, "_save").click()
+            if js_find(driver, SEL_SUCCESS, 20000) is None:
+                raise Exception(f"Save confirmation not shown for unit {unit_id}.")
+            result["Details"] += f"Enabled review for {unit_id}; "
+
+    except Exception as e:
+        log.error(f"Failed while processing ID: {original_assess_id}")
+        log.error(str(e))
+        result["Status"] = "Failed"
+        result["Details"] += str(e)
+        if not reset_driver(driver, *creds):
+            log.error("Driver could not be restored to a logged-in state; "
+                      "it will be replaced.")
+            return result, log, False
+    return result, log, True
+
+def iter_results(username, password, assessment_data):
+    """Run the automation, yielding one result dict per processed line.
+
+    The caller owns the summary table and renders it as results stream in;
+    progress and per-row logs are emitted here as rows complete.
+    """
+    # csv handles quoted IDs that a plain line.split(',') would mangle.
+    # Parsing runs before any browser work so every bad line is visible
+    # upfront and a fully-malformed paste never launches Chrome at all.
+    rows = [row for row in csv.reader(io.StringIO(assessment_data.strip())) if row]
+    total_lines = len(rows)
     st.info(f"Found {total_lines} assessments to process.")
     if total_lines == 0:
         st.warning("No data found.")
-        driver.quit()
         return
 
-    progress_bar = st.progress(0)
-    results = []
-
-    for i, line in enumerate(lines):
-        result = {"ID": "", "Status": "Failed", "Details": ""}
+    # Pre-parse every row's review delay and flag malformed lines before any
+    # browser time is spent. The compiled regex gates the shape, but only
+    # strptime catches value-invalid timestamps like Feb 30, so it stays
+    # guarded; the delay is relative to script start.
+    now = datetime.now()
+    valid, invalid = [], []
+    for row in rows:
+        assess_id = row[0].strip()
+        completion = row[1].strip() if len(row) == 2 else ""
+        if not _DT_RE.match(completion):
+            invalid.append(assess_id)
+            continue
+        if len(completion) == 16:
+            completion += ":00"
         try:
-            parts = line.split(',')
-            if len(parts) != 2:
-                result["Details"] = "Malformed input line"
-                results.append(result)
-                progress_bar.progress((i + 1) / total_lines)
-                continue
+            completion_dt = datetime.strptime(completion, "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            invalid.append(assess_id)
+            continue
+        valid.append((assess_id, max(0, int((now - completion_dt).total_seconds()))))
+    if invalid:
+        st.warning("Skipping %d malformed line(s): %s" % (
+            len(invalid), ", ".join(invalid[:10])))
+    if not valid:
+        st.error("No valid rows to process.")
+        return
 
-            original_assess_id = parts[0].strip()
-            completion_time_str = parts[1].strip()
-            result["ID"] = original_assess_id
+    try:
+        st.info("🚀 Launching the automation robots...")
+        pool = get_driver_pool(username, password)
+        if _pool_session_expired(pool):
+            drain_driver_pool(pool)
+            get_driver_pool.clear()
+            pool = get_driver_pool(username, password)
+        st.success(f"✅ {POOL_SIZE} robots launched and logged in.")
+    except Exception as e:
+        st.error(f"Failed to start Chrome. Error: {e}")
+        return
 
-            # Parse datetime
-            try:
-                completion_dt = datetime.strptime(completion_time_str, '%Y-%m-%d %H:%M:%S')
-            except ValueError:
-                completion_dt = datetime.strptime(completion_time_str, '%Y-%m-%d %H:%M')
-
-            # --- Step 1: Create Review Config ---
-            add_config_url = "https://nxtwave-assessments-backend-topin-prod-apis.ccbp.in/admin/nw_assessments_core/orgassessreviewconfig/add/"
-            current_dt = datetime.now()
-            time_delta_seconds = max(int((current_dt - completion_dt).total_seconds()), 0)
-
-            driver.get(add_config_url)
-            wait.until(EC.element_to_be_clickable(
-                (By.CSS_SELECTOR, "span[aria-labelledby='select2-id_org_assess-container']"))).click()
-            search_box = wait.until(EC.presence_of_element_located((By.CLASS_NAME, "select2-search__field")))
-            search_box.send_keys(original_assess_id[:8])
-
-            suggestion_locator = (By.XPATH, f"//li[contains(@class, 'select2-results__option') and contains(text(), '{original_assess_id}')]")
-            wait.until(EC.element_to_be_clickable(suggestion_locator)).click()
-
-            wait.until(EC.presence_of_element_located((By.ID, "id_review_mode"))).send_keys('ASSESS_COMPLETION')
-            time_input = driver.find_element(By.ID, "id_time_to_enable_review_in_secs")
-            time_input.clear()
-            time_input.send_keys(str(time_delta_seconds))
-            driver.find_element(By.NAME, "_save").click()
-            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "li.success")))
-            st.success(f"✅ Step 1 complete for {original_assess_id}")
-            result["Status"] = "Success"
-            result["Details"] += "Review config created; "
-
-            # --- Step 2: Find New Assessment ID ---
-            org_assess_url = "https://nxtwave-assessments-backend-topin-prod-apis.ccbp.in/admin/nw_assessments_core/organisationassessment/"
-            driver.get(org_assess_url)
-            search_bar = wait.until(EC.presence_of_element_located((By.ID, "searchbar")))
-            search_bar.clear()
-            search_bar.send_keys(original_assess_id[:8])
-            driver.find_element(By.CSS_SELECTOR, 'input[value="Search"]').click()
-
-            new_assess_id_locator = (By.CSS_SELECTOR, "#result_list td.field-assessment_id")
-            new_assessment_id = get_stale_proof_text(driver, new_assess_id_locator)
-            st.success(f"✅ Found new assessment ID: {new_assessment_id}")
-            result["Details"] += f"New ID: {new_assessment_id}; "
-
-            # --- Step 3: Find Unit IDs ---
-            assess_level_url = "https://nxtwave-assessments-backend-topin-prod-apis.ccbp.in/admin/nw_assessments_core/assessmentlevel/"
-            driver.get(assess_level_url)
-            search_bar = wait.until(EC.presence_of_element_located((By.ID, "searchbar")))
-            search_bar.clear()
-            search_bar.send_keys(new_assessment_id[:8])
-            driver.find_element(By.CSS_SELECTOR, 'input[value="Search"]').click()
-
-            unit_ids = []
-            attempts = 0
-            while attempts < 3:
-                try:
-                    unit_id_elements = wait.until(EC.presence_of_all_elements_located(
-                        (By.CSS_SELECTOR, "#result_list td.field-unit_id")))
-                    unit_ids = [elem.text for elem in unit_id_elements]
-                    break
-                except StaleElementReferenceException:
-                    attempts += 1
-                    st.warning(f"Retrying to read Unit IDs (Attempt {attempts}/3)...")
-                    time.sleep(1)
-
-            if not unit_ids:
-                st.error("Could not find any Unit IDs.")
-                result["Details"] += "No Unit IDs found; "
-                results.append(result)
-                progress_bar.progress((i + 1) / total_lines)
-                continue
+    progress_bar = st.progress(0)
 
-            st.success(f"✅ Found {len(unit_ids)} Unit ID(s): {unit_ids}")
-            result["Details"] += f"Found {len(unit_ids)} units; "
-
-            # --- Step 4: Enable Review for Each Unit ---
-            exam_url = "https://nxtwave-assessments-backend-topin-prod-apis.ccbp.in/admin/nkb_exam/exam/"
-            for unit_id in unit_ids:
-                driver.get(exam_url)
-                search_bar = wait.until(EC.presence_of_element_located((By.ID, "searchbar")))
-                search_bar.clear()
-                search_bar.send_keys(unit_id[:8])
-                driver.find_element(By.CSS_SELECTOR, 'input[value="Search"]').click()
-
-                exam_link_locator = (By.CSS_SELECTOR, "#result_list th.field-id a")
-                stale_proof_click(driver, exam_link_locator)
-
-                review_checkbox = wait.until(EC.presence_of_element_located((By.ID, "id_enable_attempt_review")))
-                if not review_checkbox.is_selected():
-                    review_checkbox.click()
-                driver.find_element(By.NAME, "_save").click()
-                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "li.success")))
-                result["Details"] += f"Enabled review for {unit_id}; "
+    # Malformed rows never reach a driver; report them straight away.
+    done = 0
+    for assess_id in invalid:
+        done += 1
+        progress_bar.progress(done / total_lines)
+        yield {"ID": assess_id, "Status": "Failed",
+               "Details": "Malformed line or unparseable timestamp"}
+
+    # Rows share no state, so they are fanned out across the driver pool;
+    # each worker borrows a pre-logged-in driver for the whole row.
+    # Fresh memo per run so stale search results never leak between batches
+    # (or between credential sets).
+    search_cache = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=POOL_SIZE) as executor:
+        futures = [executor.submit(process_row, assess_id, delta_s, pool,
+                                   (username, password), search_cache)
+                   for assess_id, delta_s in valid]
+        for future in concurrent.futures.as_completed(futures):
+            done += 1
+            result, log = future.result()
+            # One expander per assessment instead of a widget per log line;
+            # failures open expanded so they stand out in long batches.
+            with st.expander(f"{result['ID']} — {result['Status']}",
+                             expanded=(result["Status"] == "Failed")):
+                st.markdown("\n\n".join(log.lines))
+            progress_bar.progress(done / total_lines)
+            yield result
 
-        except Exception as e:
-            st.error(f"❌ Failed while processing ID: {original_assess_id}")
-            st.exception(e)
-            result["Status"] = "Failed"
-            result["Details"] += str(e)
-        finally:
-            results.append(result)
-            progress_bar.progress((i + 1) / total_lines)
-
-    driver.quit()
-    st.subheader("📊 Processing Summary")
-    st.dataframe(pd.DataFrame(results))
     st.success("🎉 All tasks complete!")
 
 # ==================================================================
@@ -247,7 +822,14 @@ def main():
             st.error("Please fill all fields")
         else:
             with st.spinner("Processing assessments..."):
-                perform_automation(username, password, assessment_data_input)
+                st.subheader("📊 Processing Summary")
+                summary_slot = st.empty()
+                acc = []
+                for result in iter_results(username, password, assessment_data_input):
+                    acc.append(result)
+                    # Only the tail is re-rendered, so a huge batch never
+                    # rebuilds an ever-growing table on each completion.
+                    summary_slot.table(acc[-50:])
 
 if __name__ == "__main__":
     main()